@@ -1,21 +1,34 @@
 import argparse
+import functools
+import os
 import sys
 from pathlib import Path
 
-from .config import check_connectivity, ensure_config, interactive_setup, resolve_remote_host
-from .submit import cancel_job, check_job_status, submit
+# .config and .submit are imported inside main() so each branch only loads
+# what it needs; --help never imports yaml or the submission machinery.
 
 
+_EPILOG = """\
+The whole directory containing the job script is transferred (minus output/).
+--files adds paths from outside that directory. The remote directory name
+defaults to #SBATCH --job-name from the script; --jobname overrides it.
+--check tests SSH connectivity and the remote base path using the saved config.
+"""
+
+
+@functools.lru_cache(maxsize=1)
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="hpc-submit",
         description="Submit SLURM job scripts to a remote HPC cluster via SSH.",
+        epilog=_EPILOG,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     parser.add_argument(
         "job_script",
         nargs="?",
         type=Path,
-        help="Path to the .sh job script to submit.",
+        help="The .sh job script to submit.",
     )
     parser.add_argument(
         "--files",
@@ -23,80 +36,111 @@ def build_parser() -> argparse.ArgumentParser:
         type=Path,
         default=[],
         metavar="PATH",
-        help="Additional files or directories to transfer alongside the job script.",
+        help="Extra files or directories to transfer.",
     )
     parser.add_argument(
         "--jobname",
         type=str,
         default=None,
-        help="Override the remote directory name. Defaults to #SBATCH --job-name from the script.",
+        help="Remote directory name.",
     )
     parser.add_argument(
         "--cancel",
         type=int,
         metavar="JOB_ID",
-        help="Cancel a running job by its SLURM job ID.",
+        help="Cancel a job.",
     )
     parser.add_argument(
         "--status",
         type=int,
         metavar="JOB_ID",
-        help="Check the status of a running or completed job.",
+        help="Show a job's status.",
     )
     parser.add_argument(
         "--overwrite",
         action="store_true",
-        help="Overwrite the remote directory if it already exists (no prompt).",
+        help="Overwrite an existing remote directory without asking.",
     )
     parser.add_argument(
         "--init",
         action="store_true",
-        help="Run (or re-run) interactive configuration setup.",
+        help="Run interactive configuration setup.",
     )
     parser.add_argument(
         "--check",
         action="store_true",
-        help="Test SSH connectivity and remote path access using saved config.",
+        help="Test SSH connectivity and the remote path.",
     )
     return parser
 
 
-def validate_args(args: argparse.Namespace) -> None:
+def validate_args(args: argparse.Namespace) -> dict[Path, os.stat_result]:
+    """Check the arguments; returns one stat per --files entry for reuse."""
     if not args.job_script.exists():
         print(f"Error: job script not found: {args.job_script}", file=sys.stderr)
         sys.exit(1)
     if args.job_script.suffix != ".sh":
         print(f"Error: job script must be a .sh file, got: {args.job_script}", file=sys.stderr)
         sys.exit(1)
+    file_stats: dict[Path, os.stat_result] = {}
     for f in args.files:
-        if not f.exists():
-            print(f"Error: file not found: {f}", file=sys.stderr)
+        try:
+            file_stats[f] = os.stat(f)
+        except OSError as e:
+            print(f"Error: cannot access {f}: {e.strerror}", file=sys.stderr)
             sys.exit(1)
+    return file_stats
+
+
+def run_job_command(flag: str, job_id: int) -> None:
+    """Run --cancel or --status for a single job ID."""
+    from .config import ensure_config, resolve_remote_host
+    from .submit import cancel_job, check_job_status
+
+    # Each is a single ssh exec, so neither opens an ssh_session(): a private
+    # ControlMaster would only add processes.
+    config = ensure_config()
+    remote_host = resolve_remote_host(config)
+    if flag == "--cancel":
+        cancel_job(remote_host, job_id)
+    check_job_status(remote_host, job_id)
 
 
 def main() -> None:
     try:
+        # Fast path: `hpc-submit --cancel ID` / `--status ID` skip argparse.
+        # Anything unusual (e.g. a non-integer ID) falls through to the full
+        # parser so the user still gets its error message.
+        if len(sys.argv) == 3 and sys.argv[1] in ("--cancel", "--status"):
+            try:
+                job_id = int(sys.argv[2])
+            except ValueError:
+                pass
+            else:
+                run_job_command(sys.argv[1], job_id)
+                sys.exit(0)
+
         parser = build_parser()
         args = parser.parse_args()
 
         if args.cancel is not None:
-            config = ensure_config()
-            remote_host = resolve_remote_host(config)
-            cancel_job(remote_host, args.cancel)
+            run_job_command("--cancel", args.cancel)
             sys.exit(0)
 
         if args.status is not None:
-            config = ensure_config()
-            remote_host = resolve_remote_host(config)
-            check_job_status(remote_host, args.status)
+            run_job_command("--status", args.status)
             sys.exit(0)
 
         if args.check:
+            from .config import check_connectivity, ensure_config
+
             config = ensure_config()
             success = check_connectivity(config)
             sys.exit(0 if success else 1)
 
         if args.init:
+            from .config import interactive_setup
+
             interactive_setup()
             if args.job_script is None:
                 print("Configuration saved. You can now run: hpc-submit <script.sh>")
@@ -105,19 +149,24 @@ def main() -> None:
         if args.job_script is None:
             parser.error("the following arguments are required: job_script")
 
-        validate_args(args)
+        file_stats = validate_args(args)
+
+        from .config import ensure_config, resolve_remote_host
+        from .submit import ssh_session, submit
 
         config = ensure_config()
         remote_host = resolve_remote_host(config)
 
-        submit(
-            job_script=args.job_script,
-            remote_host=remote_host,
-            remote_base_path=config.remote_base_path,
-            name=args.jobname,
-            extra_files=args.files,
-            overwrite=args.overwrite,
-        )
+        with ssh_session(remote_host):
+            submit(
+                job_script=args.job_script,
+                remote_host=remote_host,
+                remote_base_path=config.remote_base_path,
+                name=args.jobname,
+                extra_files=args.files,
+                overwrite=args.overwrite,
+                file_stats=file_stats,
+            )
     except KeyboardInterrupt:
         print("\nAborted.", file=sys.stderr)
         sys.exit(130)
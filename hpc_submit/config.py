@@ -1,13 +1,29 @@
+import errno
+import functools
 import os
+import re
+import socket
 import subprocess
 import sys
-from dataclasses import asdict, dataclass
-from pathlib import Path
+from dataclasses import dataclass
 
-import yaml
+from .shell import quote_remote_path
 
-CONFIG_DIR = Path.home() / ".config" / "hpc-submit"
-CONFIG_PATH = CONFIG_DIR / "config.yaml"
+# Plain strings computed once at import; this module sits on every CLI path.
+CONFIG_DIR = os.path.join(
+    os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"), "hpc-submit"
+)
+CONFIG_PATH = os.path.join(CONFIG_DIR, "config.yaml")
+# Where configs lived before XDG_CONFIG_HOME was honoured; still read so that
+# setting the variable later does not silently drop an existing config.
+LEGACY_CONFIG_PATH = os.path.expanduser("~/.config/hpc-submit/config.yaml")
+
+# The config is a flat mapping of string keys to string values, so it is read
+# and written without PyYAML. Anything beyond that subset is handed to PyYAML
+# (if installed), keeping hand-edited files with richer syntax working.
+_KEY_RE = re.compile(r"\w+")
+_PLAIN_RE = re.compile(r"[\w@./~+-]+")
+_YAML_WORDS = {"", "~", "null", "true", "false", "yes", "no", "on", "off", "y", "n"}
 
 
 @dataclass
@@ -17,15 +33,72 @@ class Config:
     remote_host_env: str = ""  # deprecated: env var name, kept for backwards compat
 
 
-def load_config() -> Config:
-    try:
-        raw = yaml.safe_load(CONFIG_PATH.read_text())
-    except yaml.YAMLError:
-        print(f"Error: config file is not valid YAML: {CONFIG_PATH}", file=sys.stderr)
-        sys.exit(1)
+def _parse_flat_yaml(text: str) -> dict | None:
+    """Parse 'key: value' lines. Returns None on any syntax outside that subset."""
+    data: dict = {}
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if line[0].isspace():
+            return None
+        key, sep, value = line.partition(":")
+        value = value.strip()
+        if not sep or not _KEY_RE.fullmatch(key):
+            return None
+        if len(value) >= 2 and value[0] == value[-1] == "'":
+            inner = value[1:-1]
+            if "'" in inner.replace("''", ""):
+                return None
+            value = inner.replace("''", "'")
+        elif len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+            if '"' in value or "\\" in value:
+                return None
+        elif (
+            value.lower() in _YAML_WORDS
+            or value[0] in "[]{}|>&*!%@`'\""
+            or ": " in value
+            or " #" in value
+        ):
+            return None
+        data[key] = value
+    return data
+
+
+def _yaml_scalar(value: str) -> str:
+    if (
+        _PLAIN_RE.fullmatch(value)
+        and value.lower() not in _YAML_WORDS
+        and value[0] not in "0123456789+-.@`"
+    ):
+        return value
+    return "'" + value.replace("'", "''") + "'"
+
+
+def load_config(path: str | None = None) -> Config:
+    path = path or CONFIG_PATH
+    with open(path) as f:
+        text = f.read()
+    raw = _parse_flat_yaml(text)
+    if raw is None:
+        try:
+            import yaml
+        except ImportError:
+            print(
+                f"Error: config file uses YAML syntax beyond simple 'key: value' lines: {path}\n"
+                "  Simplify it, install PyYAML, or run: hpc-submit --init",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        try:
+            raw = yaml.safe_load(text)
+        except yaml.YAMLError:
+            print(f"Error: config file is not valid YAML: {path}", file=sys.stderr)
+            sys.exit(1)
 
     if not isinstance(raw, dict):
-        print(f"Error: config file must be a YAML mapping: {CONFIG_PATH}", file=sys.stderr)
+        print(f"Error: config file must be a YAML mapping: {path}", file=sys.stderr)
         sys.exit(1)
 
     if "remote_base_path" not in raw or not raw["remote_base_path"]:
@@ -50,14 +123,15 @@ def load_config() -> Config:
 
 
 def save_config(config: Config) -> None:
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    os.makedirs(CONFIG_DIR, exist_ok=True)
     data: dict = {}
     if config.remote_host:
         data["remote_host"] = config.remote_host
     data["remote_base_path"] = config.remote_base_path
     if config.remote_host_env:
         data["remote_host_env"] = config.remote_host_env
-    CONFIG_PATH.write_text(yaml.safe_dump(data, default_flow_style=False))
+    with open(CONFIG_PATH, "w") as f:
+        f.write("".join(f"{k}: {_yaml_scalar(v)}\n" for k, v in data.items()))
 
 
 def resolve_remote_host(config: Config) -> str:
@@ -94,12 +168,69 @@ def resolve_remote_host(config: Config) -> str:
 # SSH diagnostics
 # ---------------------------------------------------------------------------
 
+def _probe_ssh_port(host: str) -> str | None:
+    """Quick TCP connect to the host's SSH port, resolved via `ssh -G`.
+
+    Returns an ssh-style error line on failure, or None if the port answered or
+    the probe does not apply (proxied hosts, existing ControlMaster setups).
+    """
+    try:
+        result = subprocess.run(
+            ["ssh", "-G", host],
+            stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=5,
+        )
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        return None
+    if result.returncode != 0:
+        return None
+
+    options = dict(line.split(" ", 1) for line in result.stdout.splitlines() if " " in line)
+    if "proxyjump" in options or "proxycommand" in options:
+        return None
+    if options.get("controlmaster", "false") not in ("false", "no"):
+        return None
+    hostname = options.get("hostname", host)
+    try:
+        port = int(options.get("port", "22"))
+    except ValueError:
+        return None
+
+    # create_connection tries every address getaddrinfo returns (IPv4 and
+    # IPv6), as ssh does, and raises the last error if none answers.
+    try:
+        socket.create_connection((hostname, port), timeout=2).close()
+    except socket.gaierror as e:
+        if e.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", None)):
+            return f"ssh: Could not resolve hostname {hostname}: {e.strerror}"
+        return None
+    except TimeoutError:
+        reason = "Connection timed out"
+    except OSError as e:
+        if e.errno is None:
+            return None
+        if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ETIMEDOUT):
+            reason = "Connection timed out"
+        else:
+            reason = os.strerror(e.errno)
+    else:
+        return None
+    return f"ssh: connect to host {hostname} port {port}: {reason}"
+
+
+@functools.lru_cache(maxsize=None)
 def test_ssh_connection(host: str) -> tuple[bool, str]:
     """Test SSH connectivity in batch mode.
 
     Returns (success, message) with actionable guidance on failure.
     All diagnosis comes from ssh's exit code and stderr — no .ssh files are read.
+    A 2-second TCP probe runs first so an unreachable host fails fast instead
+    of waiting out ssh's 10-second ConnectTimeout. Results are cached for the
+    lifetime of the process.
     """
+    probe_error = _probe_ssh_port(host)
+    if probe_error is not None:
+        return _diagnose_ssh_failure(host, 255, probe_error)
+
     try:
         result = subprocess.run(
             [
@@ -124,7 +255,12 @@ def test_ssh_connection(host: str) -> tuple[bool, str]:
     if result.returncode == 0 and "__hpc_submit_ok__" in result.stdout:
         return (True, f"Connected to '{host}'.")
 
-    stderr = result.stderr.strip().lower()
+    return _diagnose_ssh_failure(host, result.returncode, result.stderr)
+
+
+def _diagnose_ssh_failure(host: str, returncode: int, raw_stderr: str) -> tuple[bool, str]:
+    """Turn a failed ssh's exit code and stderr into actionable guidance."""
+    stderr = raw_stderr.strip().lower()
 
     if "could not resolve hostname" in stderr:
         return (False,
@@ -139,6 +275,12 @@ def test_ssh_connection(host: str) -> tuple[bool, str]:
             "  - The server may be down or decommissioned\n"
             "  - Try a different login node if available")
 
+    if any(m in stderr for m in ("timed out", "no route to host", "network is unreachable")):
+        return (False,
+            f"'{host}' is unreachable\n"
+            "  - You may need to be on the cluster's network or VPN\n"
+            "  - A firewall may be blocking the SSH port")
+
     if "host key verification failed" in stderr:
         return (False,
             f"Host key verification failed for '{host}'\n"
@@ -181,16 +323,21 @@ def test_ssh_connection(host: str) -> tuple[bool, str]:
     if "permission denied" in stderr:
         return (False,
             f"Permission denied connecting to '{host}'\n"
-            f"  SSH error: {result.stderr.strip()}")
+            f"  SSH error: {raw_stderr.strip()}")
 
     return (False,
-        f"SSH connection to '{host}' failed (exit code {result.returncode}).\n"
-        f"  SSH error: {result.stderr.strip()}\n"
+        f"SSH connection to '{host}' failed (exit code {returncode}).\n"
+        f"  SSH error: {raw_stderr.strip()}\n"
         f"  Try connecting manually: ssh {host}")
 
 
+@functools.lru_cache(maxsize=None)
 def test_remote_path(host: str, path: str) -> tuple[bool, str]:
-    """Test that a remote path exists (or can be created) and is writable."""
+    """Test that a remote path exists (or can be created) and is writable.
+
+    Results are cached for the lifetime of the process.
+    """
+    qpath = quote_remote_path(path)
     try:
         result = subprocess.run(
             [
@@ -198,7 +345,7 @@ def test_remote_path(host: str, path: str) -> tuple[bool, str]:
                 "-o", "BatchMode=yes",
                 "-o", "ConnectTimeout=10",
                 host,
-                f"mkdir -p {path} && test -w {path} && echo __path_ok__",
+                f"mkdir -p {qpath} && test -w {qpath} && echo __path_ok__",
             ],
             capture_output=True,
             text=True,
@@ -312,6 +459,10 @@ def check_connectivity(config: Config) -> bool:
 
 
 def ensure_config() -> Config:
-    if CONFIG_PATH.exists():
-        return load_config()
-    return interactive_setup()
+    try:
+        os.stat(CONFIG_PATH)
+    except FileNotFoundError:
+        if CONFIG_PATH != LEGACY_CONFIG_PATH and os.path.isfile(LEGACY_CONFIG_PATH):
+            return load_config(LEGACY_CONFIG_PATH)
+        return interactive_setup()
+    return load_config()
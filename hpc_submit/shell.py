@@ -0,0 +1,22 @@
+import re
+import shlex
+
+_TILDE_RE = re.compile(r"~[\w.-]*(?=/|$)")
+
+
+def quote_remote_path(path: str) -> str:
+    """Shell-quote a remote path, leaving a leading ~ or ~user expandable."""
+    match = _TILDE_RE.match(path)
+    if match is None:
+        return shlex.quote(path)
+    rest = path[match.end():]
+    return match.group() + (f"/{shlex.quote(rest[1:])}" if rest[1:] else rest)
+
+
+def sh_command(script: str) -> str:
+    """Wrap a POSIX sh script so it runs the same under any remote login shell.
+
+    ssh hands its command to the user's login shell, which on many clusters is
+    csh/tcsh; those reject if/then/fi, $((...)) and 2>/dev/null.
+    """
+    return f"sh -c {shlex.quote(script)}"
@@ -1,31 +1,211 @@
+import functools
+import os
 import re
+import shlex
+import shutil
+import stat
 import subprocess
 import sys
+import tempfile
+from collections import Counter
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from typing import NoReturn
 
+from .shell import quote_remote_path, sh_command
 
-def parse_sbatch_directive(job_script: Path, directive: str) -> str | None:
-    for line in job_script.read_text().splitlines():
-        match = re.match(rf"^#SBATCH\s+--{directive}=(.+)", line)
-        if match:
-            return match.group(1).strip()
-    return None
+# Extra ssh options pointing at the ControlMaster socket opened by
+# ssh_session(). Empty outside a session (or when the user's own master is
+# already in use), in which case plain ssh is run.
+_ssh_opts: list[str] = []
 
 
-def sanitize_dir_name(name: str) -> str:
-    sanitized = re.sub(r"\s+", "_", name)
-    sanitized = re.sub(r"[^a-zA-Z0-9_\-]", "", sanitized)
-    return sanitized if sanitized else "job"
+@contextmanager
+def ssh_session(remote_host: str) -> Iterator[list[str]]:
+    """Open one multiplexed SSH connection reused by every ssh/rsync call.
+
+    If the user already has a ControlMaster running for this host (e.g. set
+    up in ~/.ssh/config for 2FA), that one is reused and nothing is started.
+    If the master cannot be started, calls fall back to plain ssh.
+    """
+    global _ssh_opts
+
+    check = subprocess.run(
+        ["ssh", "-O", "check", remote_host],
+        stdin=subprocess.DEVNULL, capture_output=True,
+    )
+    if check.returncode == 0:
+        yield []
+        return
+
+    tmpdir = tempfile.mkdtemp(prefix="hpc-submit-")
+    # %C is a short hash of %l%h%p%r, keeping the socket path under the
+    # unix socket length limit even with long TMPDIRs.
+    control_path = f"{tmpdir}/cm-%C"
+    started = subprocess.run(
+        [
+            "ssh",
+            "-o", "ControlMaster=yes",
+            "-o", f"ControlPath={control_path}",
+            # Stay up however long the user sits at a prompt; the finally
+            # block below shuts the master down with -O exit.
+            "-o", "ControlPersist=yes",
+            "-fN",
+            remote_host,
+        ],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    if started.returncode != 0:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        yield []
+        return
+
+    _ssh_opts = ["-o", f"ControlPath={control_path}"]
+    try:
+        yield _ssh_opts
+    finally:
+        subprocess.run(
+            ["ssh", "-O", "exit", "-o", f"ControlPath={control_path}", remote_host],
+            capture_output=True,
+        )
+        _ssh_opts = []
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _ssh(remote_host: str, command: str) -> list[str]:
+    return ["ssh", *_ssh_opts, remote_host, command]
+
+
+def _ssh_quiet(remote_host: str, command: str) -> tuple[int, str, str]:
+    """Run a short remote command and return (returncode, stdout, stderr).
+
+    stdin is closed so ssh cannot swallow the terminal. Output is captured as
+    bytes and decoded as ASCII; stderr is only decoded when the command failed.
+    """
+    result = subprocess.run(
+        _ssh(remote_host, command),
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        check=False,
+    )
+    stdout = result.stdout.decode("ascii", errors="replace")
+    stderr = result.stderr.decode("ascii", errors="replace") if result.returncode else ""
+    return result.returncode, stdout, stderr
+
+
+def _rsync_ssh() -> list[str]:
+    """rsync's remote shell: the session master, without SSH-level compression.
+
+    rsync compresses the stream itself, so compressing again in ssh only costs CPU.
+    """
+    return ["-e", shlex.join(["ssh", *_ssh_opts, "-o", "Compression=no"])]
+
+
+# Extensions whose contents are already compressed; rsync sends them as-is.
+_SKIP_COMPRESS = "gz/bz2/xz/zst/zip/bam/cram/npz/pt/pth/h5"
+
+
+@functools.lru_cache(maxsize=1)
+def _rsync_version() -> tuple[int, ...]:
+    """Version of the local rsync, or (0, 0, 0) if it cannot be determined."""
+    try:
+        out = subprocess.run(["rsync", "--version"], capture_output=True, text=True).stdout
+    except FileNotFoundError:
+        out = ""
+    match = re.search(r"version\s+(\d+)\.(\d+)\.?(\d*)", out)
+    return tuple(int(g or 0) for g in match.groups()) if match else (0, 0, 0)
+
+
+def _rsync_remote_arg(remote_host: str, remote_path: str) -> str:
+    """The host:path/ argument for rsync, safe for paths with spaces.
+
+    rsync 3.2.4+ protects remote args itself. Older versions hand the path to
+    the remote shell verbatim, so it is shell-quoted (leaving ~ expandable).
+    """
+    if _rsync_version() < (3, 2, 4):
+        remote_path = quote_remote_path(remote_path)
+    return f"{remote_host}:{remote_path}/"
+
+
+@functools.lru_cache(maxsize=1)
+def _rsync_flags() -> tuple[str, ...]:
+    """Transfer flags supported by the local rsync.
+
+    No compression algorithm is forced: rsync 3.2+ negotiates zstd itself when
+    both ends support it, while an explicit --compress-choice breaks against
+    older cluster-side rsync.
+    """
+    flags = ["-a", "--partial", "--inplace", "-z", "--compress-level=1"]
+    if _rsync_version() >= (3, 0, 0):
+        flags.append(f"--skip-compress={_SKIP_COMPRESS}")
+    return tuple(flags)
+
+
+@functools.lru_cache(maxsize=1)
+def _rsync_progress_flags() -> tuple[str, ...]:
+    """Output flags for the one transfer whose progress is shown.
+
+    Only one rsync at a time may draw a live progress line, or the parallel
+    transfers overwrite each other's updates. Off a terminal the live line is
+    just megabytes of carriage returns in a log, so a summary is printed
+    instead. macOS still ships rsync 2.6.9 (or openrsync claiming it), which
+    lacks --info and --no-inc-recursive.
+    """
+    interactive = sys.stdout.isatty()
+    if _rsync_version() >= (3, 1, 0):
+        if interactive:
+            # A full file list up front keeps progress2's overall total accurate.
+            return ("--info=progress2", "--no-inc-recursive")
+        return ("--info=stats2,flist0",)
+    return ("-v", "--progress") if interactive else ("-v",)
+
+
+_SBATCH_RE = re.compile(r"^#SBATCH\s+--([\w-]+)=(.+)")
+_WS_RE = re.compile(r"\s+")
+_BAD_RE = re.compile(r"[^a-zA-Z0-9_\-]")
+
+
+def parse_sbatch_header(job_script: Path) -> dict[str, str]:
+    """Return the long-form #SBATCH directives of a script, e.g. {"job-name": "x"}.
+
+    Only the header is read: SLURM ignores directives after the first command,
+    so the file is streamed and closed as soon as the header ends.
+    """
+    directives: dict[str, str] = {}
+    with job_script.open() as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped and not stripped.startswith("#"):
+                break
+            match = _SBATCH_RE.match(line)
+            if match:
+                directives.setdefault(match.group(1), match.group(2).strip())
+    return directives
 
 
-def remote_dir_exists(remote_host: str, remote_path: str) -> bool:
-    cmd = ["ssh", remote_host, f"test -d {remote_path}"]
-    result = subprocess.run(cmd, capture_output=True)
-    return result.returncode == 0
+def sanitize_dir_name(name: str) -> str:
+    sanitized = _WS_RE.sub("_", name)
+    sanitized = _BAD_RE.sub("", sanitized)
+    return sanitized if sanitized else "job"
 
 
 def resolve_remote_path(remote_host: str, remote_path: str, overwrite: bool = False) -> str:
-    if not remote_dir_exists(remote_host, remote_path):
+    # One round-trip: report whether the path is taken and, if so, the first
+    # free _N suffix, so picking a new numbered directory needs no more probes.
+    probe = (
+        f"p={quote_remote_path(remote_path)}; "
+        'if [ ! -e "$p" ]; then echo FREE; '
+        'else n=1; while [ -e "${p}_$n" ]; do n=$((n+1)); done; echo "EXISTS $n"; fi'
+    )
+    rc, stdout, stderr = _ssh_quiet(remote_host, sh_command(probe))
+    status = stdout.strip().split()
+    if rc != 0 or not status or status[0] not in ("FREE", "EXISTS"):
+        print(f"Error: failed to check remote directory {remote_path}", file=sys.stderr)
+        print(f"  ssh stderr: {stderr.strip()}", file=sys.stderr)
+        sys.exit(1)
+
+    if status[0] == "FREE":
         return remote_path
 
     print(f"Remote directory already exists: {remote_path}")
@@ -38,23 +218,35 @@ def resolve_remote_path(remote_host: str, remote_path: str, overwrite: bool = Fa
     if choice == "o":
         return remote_path
 
-    # Find next available _N suffix
-    n = 1
-    while True:
-        candidate = f"{remote_path}_{n}"
-        if not remote_dir_exists(remote_host, candidate):
-            print(f"  Using: {candidate}")
-            return candidate
-        n += 1
-
-
-def create_remote_dir(remote_host: str, remote_path: str) -> None:
-    cmd = ["ssh", remote_host, f"mkdir -p {remote_path}"]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"Error: failed to create remote directory {remote_path}", file=sys.stderr)
-        print(f"  ssh stderr: {result.stderr.strip()}", file=sys.stderr)
-        sys.exit(1)
+    candidate = f"{remote_path}_{status[1]}"
+    print(f"  Using: {candidate}")
+    return candidate
+
+
+# --files entries below this size are bundled into one tar stream instead of
+# paying an rsync (and ssh channel) each.
+_SMALL_FILE_BYTES = 4096
+
+
+def _run_returncode(cmd: list[str]) -> int:
+    return subprocess.run(cmd).returncode
+
+
+def _tar_upload(remote_host: str, remote_path: str, files: list[Path]) -> int:
+    """Stream files into remote_path over a single ssh channel with tar."""
+    tar_cmd = ["tar", "-cf", "-"]
+    for f in files:
+        # Absolute: tar resolves each -C relative to the previous one.
+        tar_cmd += ["-C", str(f.parent.resolve()), f.name]
+    qpath = quote_remote_path(remote_path)
+    ssh_cmd = _ssh(remote_host, f"mkdir -p {qpath} && tar -xf - -C {qpath}")
+    # COPYFILE_DISABLE keeps macOS tar from adding ._ resource-fork files.
+    env = {**os.environ, "COPYFILE_DISABLE": "1"}
+    with subprocess.Popen(tar_cmd, stdout=subprocess.PIPE, env=env) as tar:
+        ssh = subprocess.Popen(ssh_cmd, stdin=tar.stdout)
+        tar.stdout.close()
+        ssh.wait()
+    return tar.returncode or ssh.returncode
 
 
 def transfer_files(
@@ -62,51 +254,93 @@ def transfer_files(
     remote_path: str,
     job_script: Path,
     extra_files: list[Path],
+    file_stats: dict[Path, os.stat_result] | None = None,
 ) -> None:
-    destination = f"{remote_host}:{remote_path}/"
+    """Upload the job directory and extra files.
+
+    file_stats (from validate_args) lets small regular files in extra_files be
+    sent together in one tar stream; without it every file goes through rsync.
+    """
+    destination = _rsync_remote_arg(remote_host, remote_path)
     job_dir = job_script.parent.resolve()
+    # The remote directory is created inside each transfer's own SSH channel,
+    # since the transfers below run concurrently.
+    base = [
+        "rsync", *_rsync_flags(), *_rsync_ssh(),
+        f"--rsync-path=mkdir -p {quote_remote_path(remote_path)} && rsync",
+    ]
 
     # Rsync entire job directory contents (input/, boltz_tools/, job.sh, etc.)
     # Exclude output/ to avoid re-uploading large result files on re-runs.
     print(f"Transferring contents of {job_dir}/ ...")
-    cmd = [
-        "rsync", "-avz", "--progress",
-        "--exclude=output/",
-        "--exclude=__pycache__/",
-        "--exclude=*.pyc",
-        str(job_dir) + "/",
-        destination,
+    transfers: list[tuple[str, Callable[[], int]]] = [(
+        str(job_dir),
+        functools.partial(_run_returncode, [
+            *base,
+            *_rsync_progress_flags(),
+            "--exclude=output/",
+            "--exclude=__pycache__/",
+            "--exclude=*.pyc",
+            str(job_dir) + "/",
+            destination,
+        ]),
+    )]
+
+    # Transfer any extra files specified with --files (additive, outside the job dir).
+    # These run quietly so only the job-dir rsync draws progress.
+    # An extra whose name matches a top-level job-dir entry or another extra
+    # must land after it (extras used to be copied last, in order) and must not
+    # be written by two --inplace transfers at once, so those run afterwards,
+    # one at a time, in command-line order.
+    top_level = set(os.listdir(job_dir))
+    name_counts = Counter(f.name for f in extra_files)
+    deferred = [f for f in extra_files if f.name in top_level or name_counts[f.name] > 1]
+    concurrent = [f for f in extra_files if f not in deferred]
+
+    file_stats = file_stats or {}
+    small = [
+        f for f in concurrent
+        if f in file_stats
+        and stat.S_ISREG(file_stats[f].st_mode)
+        and file_stats[f].st_size < _SMALL_FILE_BYTES
     ]
-    result = subprocess.run(cmd)
-    if result.returncode != 0:
-        print(f"Error: rsync transfer failed (exit code {result.returncode})", file=sys.stderr)
+    for f in concurrent:
+        if f not in small:
+            transfers.append((str(f), functools.partial(_run_returncode, [*base, str(f), destination])))
+    if small:
+        label = ", ".join(str(f) for f in small)
+        transfers.append((label, functools.partial(_tar_upload, remote_host, remote_path, small)))
+
+    with ThreadPoolExecutor(max_workers=min(4, len(transfers))) as pool:
+        results = list(pool.map(lambda t: t[1](), transfers))
+
+    for f in deferred:
+        transfers.append((str(f), functools.partial(_run_returncode, [*base, str(f), destination])))
+        results.append(transfers[-1][1]())
+
+    failed = [(src, rc) for (src, _), rc in zip(transfers, results) if rc != 0]
+    for src, rc in failed:
+        print(f"Error: transfer failed for {src} (exit code {rc})", file=sys.stderr)
+    if failed:
         sys.exit(1)
 
-    # Transfer any extra files specified with --files (additive, outside the job dir)
-    for f in extra_files:
-        cmd_extra = ["rsync", "-avz", "--progress", str(f), destination]
-        result = subprocess.run(cmd_extra)
-        if result.returncode != 0:
-            print(f"Error: rsync transfer failed for {f} (exit code {result.returncode})", file=sys.stderr)
-            sys.exit(1)
-
 
 def run_sbatch(
     remote_host: str,
-    remote_path: str,
-    script_name: str,
+    quoted_path: str,
+    quoted_script: str,
 ) -> int:
-    cmd = ["ssh", remote_host, f"cd {remote_path} && sbatch {script_name}"]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
+    """Submit the job; both arguments must already be shell-quoted."""
+    rc, stdout, stderr = _ssh_quiet(remote_host, f"cd {quoted_path} && sbatch {quoted_script}")
+    if rc != 0:
         print("Error: sbatch failed", file=sys.stderr)
-        if result.stdout.strip():
-            print(f"  stdout: {result.stdout.strip()}", file=sys.stderr)
-        if result.stderr.strip():
-            print(f"  stderr: {result.stderr.strip()}", file=sys.stderr)
+        if stdout.strip():
+            print(f"  stdout: {stdout.strip()}", file=sys.stderr)
+        if stderr.strip():
+            print(f"  stderr: {stderr.strip()}", file=sys.stderr)
         sys.exit(1)
 
-    stdout = result.stdout.strip()
+    stdout = stdout.strip()
     try:
         job_id = int(stdout.split()[-1])
     except (ValueError, IndexError):
@@ -116,41 +350,39 @@ def run_sbatch(
     return job_id
 
 
+_STATUS_SEP = "---SEP---"
+
+
 def check_job_status(remote_host: str, job_id: int) -> None:
-    # Try squeue first (job is still in the queue / running)
-    result = subprocess.run(
-        ["ssh", remote_host, f"squeue -j {job_id} --noheader -o '%T %r'"],
-        capture_output=True, text=True,
+    # One exec: squeue for jobs still queued / running, then sacct for
+    # completed / failed ones, separated by a marker line.
+    _, stdout, _ = _ssh_quiet(
+        remote_host,
+        sh_command(
+            f"squeue -j {job_id} --noheader -o '%T %r' 2>/dev/null; echo {_STATUS_SEP}; "
+            f"sacct -j {job_id} --noheader -n -o 'State,ExitCode,Elapsed,NodeList' 2>/dev/null"
+        ),
     )
-    if result.stdout.strip():
-        print(f"Job {job_id}: {result.stdout.strip()}")
+    queue, _, accounting = stdout.partition(_STATUS_SEP)
+    if queue.strip():
+        print(f"Job {job_id}: {queue.strip()}")
         return
-    # Fall back to sacct for completed / failed jobs
-    result = subprocess.run(
-        ["ssh", remote_host,
-         f"sacct -j {job_id} --noheader -n -o 'State,ExitCode,Elapsed,NodeList'"],
-        capture_output=True, text=True,
-    )
-    lines = [l.strip() for l in result.stdout.strip().splitlines() if l.strip()]
+    lines = [l.strip() for l in accounting.strip().splitlines() if l.strip()]
     if lines:
         print(f"Job {job_id}: {lines[0]}")
     else:
         print(f"Job {job_id}: not found")
 
 
-def cancel_job(remote_host: str, job_id: int) -> None:
-    cmd = ["ssh", remote_host, f"scancel {job_id}"]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print("Error: scancel failed", file=sys.stderr)
-        if result.stderr.strip():
-            print(f"  stderr: {result.stderr.strip()}", file=sys.stderr)
-        sys.exit(1)
-    print(f"Job {job_id} cancelled.")
+def cancel_job(remote_host: str, job_id: int) -> NoReturn:
+    """Replace this process with `ssh scancel`; ssh's exit status becomes ours."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execvp("ssh", _ssh(remote_host, f"scancel {job_id} && echo Job {job_id} cancelled."))
 
 
-def check_output_dir(job_script: Path) -> str | None:
-    output = parse_sbatch_directive(job_script, "output")
+def check_output_dir(header: dict[str, str]) -> str | None:
+    output = header.get("output")
     if output is None:
         return None
     output_dir = str(Path(output).parent)
@@ -166,9 +398,11 @@ def submit(
     name: str | None,
     extra_files: list[Path],
     overwrite: bool = False,
+    file_stats: dict[Path, os.stat_result] | None = None,
 ) -> None:
+    header = parse_sbatch_header(job_script)
     if name is None:
-        name = parse_sbatch_directive(job_script, "job-name")
+        name = header.get("job-name")
         if name is None:
             print(
                 "Error: no #SBATCH --job-name= found in script and no --jobname given",
@@ -177,7 +411,7 @@ def submit(
             sys.exit(1)
 
     # Check if --output defines a directory we should use directly
-    output_dir = check_output_dir(job_script)
+    output_dir = check_output_dir(header)
     if output_dir is not None:
         default_path = f"{remote_base_path}/{sanitize_dir_name(name)}"
         print(f"Found #SBATCH --output directory: {output_dir}")
@@ -189,14 +423,11 @@ def submit(
     else:
         remote_path = resolve_remote_path(remote_host, f"{remote_base_path}/{sanitize_dir_name(name)}", overwrite=overwrite)
 
-    print(f"Creating remote directory: {remote_path}")
-    create_remote_dir(remote_host, remote_path)
-
     print("Transferring files...")
-    transfer_files(remote_host, remote_path, job_script, extra_files)
+    transfer_files(remote_host, remote_path, job_script, extra_files, file_stats)
 
     print("Submitting job...")
-    job_id = run_sbatch(remote_host, remote_path, job_script.name)
+    job_id = run_sbatch(remote_host, quote_remote_path(remote_path), shlex.quote(job_script.name))
 
     print()
     print("-" * 40)
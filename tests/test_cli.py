@@ -0,0 +1,37 @@
+import argparse
+from pathlib import Path
+
+import pytest
+
+from hpc_submit.cli import validate_args
+
+
+def _args(job_script: Path, files: list[Path]) -> argparse.Namespace:
+    return argparse.Namespace(job_script=job_script, files=files)
+
+
+def test_validate_args_returns_stats(tmp_path):
+    script = tmp_path / "job.sh"
+    script.write_text("#!/bin/bash\n")
+    extra = tmp_path / "extra.txt"
+    extra.write_text("x")
+
+    stats = validate_args(_args(script, [extra]))
+
+    assert stats[extra].st_size == 1
+
+
+@pytest.mark.parametrize(
+    ("name", "reason"),
+    [("missing.txt", "No such file or directory"), ("plainfile/x", "Not a directory")],
+)
+def test_validate_args_reports_unstattable_file(tmp_path, capsys, name, reason):
+    script = tmp_path / "job.sh"
+    script.write_text("#!/bin/bash\n")
+    (tmp_path / "plainfile").write_text("")
+
+    with pytest.raises(SystemExit) as exc:
+        validate_args(_args(script, [tmp_path / name]))
+
+    assert exc.value.code == 1
+    assert capsys.readouterr().err == f"Error: cannot access {tmp_path / name}: {reason}\n"
@@ -0,0 +1,140 @@
+import socket
+import subprocess
+
+import pytest
+import yaml
+
+from hpc_submit import config
+
+
+def _fake_ssh_g(monkeypatch, hostname: str, port: int) -> None:
+    """Make `ssh -G` report the given HostName and Port."""
+    def run(cmd, **kwargs):
+        assert cmd[:2] == ["ssh", "-G"]
+        return subprocess.CompletedProcess(cmd, 0, stdout=f"hostname {hostname}\nport {port}\n", stderr="")
+    monkeypatch.setattr(config.subprocess, "run", run)
+
+
+def _listening(family: int, address: str) -> socket.socket:
+    sock = socket.socket(family)
+    sock.bind((address, 0))
+    sock.listen()
+    return sock
+
+
+def _closed_port(family: int, address: str) -> int:
+    with socket.socket(family) as sock:
+        sock.bind((address, 0))
+        return sock.getsockname()[1]
+
+
+def _has_ipv6_loopback() -> bool:
+    if not socket.has_ipv6:
+        return False
+    try:
+        _closed_port(socket.AF_INET6, "::1")
+    except OSError:
+        return False
+    return True
+
+
+requires_ipv6 = pytest.mark.skipif(not _has_ipv6_loopback(), reason="no IPv6 loopback")
+
+
+@requires_ipv6
+def test_probe_ipv6_host_answers(monkeypatch):
+    with _listening(socket.AF_INET6, "::1") as server:
+        _fake_ssh_g(monkeypatch, "::1", server.getsockname()[1])
+        assert config._probe_ssh_port("hpc") is None
+
+
+@requires_ipv6
+def test_probe_ipv6_host_refused(monkeypatch):
+    port = _closed_port(socket.AF_INET6, "::1")
+    _fake_ssh_g(monkeypatch, "::1", port)
+    assert config._probe_ssh_port("hpc") == f"ssh: connect to host ::1 port {port}: Connection refused"
+
+
+def test_probe_ipv4_host_answers(monkeypatch):
+    with _listening(socket.AF_INET, "127.0.0.1") as server:
+        _fake_ssh_g(monkeypatch, "127.0.0.1", server.getsockname()[1])
+        assert config._probe_ssh_port("hpc") is None
+
+
+def test_probe_unresolvable_host(monkeypatch):
+    _fake_ssh_g(monkeypatch, "nonexistent.invalid", 22)
+    msg = config._probe_ssh_port("hpc")
+    assert msg is not None and msg.startswith("ssh: Could not resolve hostname nonexistent.invalid")
+
+
+def test_probe_skipped_behind_proxyjump(monkeypatch):
+    def run(cmd, **kwargs):
+        return subprocess.CompletedProcess(cmd, 0, stdout="hostname h\nport 22\nproxyjump gw\n", stderr="")
+    monkeypatch.setattr(config.subprocess, "run", run)
+    assert config._probe_ssh_port("hpc") is None
+
+
+VALUES = [
+    "hpc",
+    "user@cluster.example.com",
+    "~/jobs",
+    "~/my jobs",
+    "/scratch/x y/z",
+    "@foo",
+    "`cmd`",
+    "it's",
+    "a: b",
+    "a #b",
+    "#x",
+    "-x",
+    "123",
+    "10.0.0.1",
+    "true",
+    "null",
+    "~",
+    'say "hi"',
+    "C:\\x",
+]
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "CONFIG_PATH", str(tmp_path / "config.yaml"))
+    return tmp_path / "config.yaml"
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_config_round_trip(config_path, value):
+    cfg = config.Config(remote_host=value, remote_base_path=value)
+    config.save_config(cfg)
+
+    assert config.load_config() == cfg
+    assert yaml.safe_load(config_path.read_text()) == {
+        "remote_host": value,
+        "remote_base_path": value,
+    }
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_load_config_written_by_pyyaml(config_path, value):
+    config_path.write_text(
+        yaml.safe_dump({"remote_host": value, "remote_base_path": value}, default_flow_style=False)
+    )
+    assert config.load_config() == config.Config(remote_host=value, remote_base_path=value)
+
+
+def test_flat_parser_defers_other_yaml_syntax():
+    assert config._parse_flat_yaml("remote_host: hpc\nextra:\n  nested: 1\n") is None
+    assert config._parse_flat_yaml("# comment\n\nremote_host: 'a''b'\n") == {"remote_host": "a'b"}
+
+
+def test_ensure_config_falls_back_to_legacy_path(config_path, tmp_path, monkeypatch):
+    legacy = tmp_path / "legacy.yaml"
+    legacy.write_text("remote_host: hpc\nremote_base_path: /scratch/me\n")
+    monkeypatch.setattr(config, "LEGACY_CONFIG_PATH", str(legacy))
+    monkeypatch.setattr(config, "interactive_setup", lambda: pytest.fail("setup prompted"))
+
+    cfg = config.ensure_config()
+
+    assert (cfg.remote_host, cfg.remote_base_path) == ("hpc", "/scratch/me")
@@ -0,0 +1,18 @@
+import pytest
+
+from hpc_submit.shell import quote_remote_path
+
+
+@pytest.mark.parametrize(
+    ("path", "quoted"),
+    [
+        ("~", "~"),
+        ("~/jobs", "~/jobs"),
+        ("~/my jobs/x", "~/'my jobs/x'"),
+        ("~bob/a b", "~bob/'a b'"),
+        ("/abs/x y", "'/abs/x y'"),
+        ("a;rm -rf", "'a;rm -rf'"),
+    ],
+)
+def test_quote_remote_path(path, quoted):
+    assert quote_remote_path(path) == quoted
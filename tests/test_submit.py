@@ -0,0 +1,136 @@
+import io
+import os
+import stat
+import subprocess
+from pathlib import Path
+
+from hpc_submit import submit
+from hpc_submit.submit import _tar_upload
+
+
+def _fake_ssh(tmp_path: Path, monkeypatch) -> None:
+    """Put an `ssh` on PATH that runs the remote command locally."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    ssh = bin_dir / "ssh"
+    ssh.write_text('#!/bin/sh\nshift\nexec sh -c "$1"\n')
+    ssh.chmod(ssh.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_tar_upload_files_in_different_relative_dirs(tmp_path, monkeypatch):
+    _fake_ssh(tmp_path, monkeypatch)
+    local = tmp_path / "local"
+    (local / "data").mkdir(parents=True)
+    (local / "other").mkdir()
+    (local / "data" / "a.txt").write_text("a")
+    (local / "other" / "b.txt").write_text("b")
+    monkeypatch.chdir(local)
+
+    remote = tmp_path / "remote dir"
+    rc = _tar_upload("hpc", str(remote), [Path("data/a.txt"), Path("other/b.txt")])
+
+    assert rc == 0
+    assert (remote / "a.txt").read_text() == "a"
+    assert (remote / "b.txt").read_text() == "b"
+
+
+def test_rsync_remote_arg_quotes_for_old_rsync(monkeypatch):
+    monkeypatch.setattr(submit, "_rsync_version", lambda: (3, 1, 3))
+    assert submit._rsync_remote_arg("hpc", "~/my jobs/x") == "hpc:~/'my jobs/x'/"
+
+
+def test_rsync_remote_arg_raw_for_new_rsync(monkeypatch):
+    monkeypatch.setattr(submit, "_rsync_version", lambda: (3, 2, 7))
+    assert submit._rsync_remote_arg("hpc", "~/my jobs/x") == "hpc:~/my jobs/x/"
+
+
+class _Tty(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+def test_only_job_dir_rsync_shows_progress(tmp_path, monkeypatch):
+    job_dir = tmp_path / "job"
+    job_dir.mkdir()
+    script = job_dir / "job.sh"
+    script.write_text("#!/bin/bash\n")
+    extra = tmp_path / "big.bin"
+    extra.write_bytes(b"x" * 8192)
+
+    commands = []
+    monkeypatch.setattr(submit, "_run_returncode", lambda cmd: commands.append(cmd) or 0)
+    monkeypatch.setattr(submit, "_rsync_version", lambda: (3, 2, 7))
+    monkeypatch.setattr(submit.sys, "stdout", _Tty())
+    submit._rsync_progress_flags.cache_clear()
+    try:
+        submit.transfer_files("hpc", "~/jobs/x", script, [extra], {extra: extra.stat()})
+    finally:
+        submit._rsync_progress_flags.cache_clear()
+
+    job_cmd, extra_cmd = sorted(commands, key=lambda c: str(extra) in c)
+    assert "--info=progress2" in job_cmd
+    assert not any(a.startswith("--info") or a == "--progress" for a in extra_cmd)
+
+
+def test_colliding_extra_files_run_after_job_dir_in_order(tmp_path, monkeypatch):
+    job_dir = tmp_path / "job"
+    job_dir.mkdir()
+    script = job_dir / "job.sh"
+    script.write_text("#!/bin/bash\n")
+    (job_dir / "data.csv").write_text("job")
+    extras = []
+    for rel in ["other/data.csv", "x/a.txt", "unique/u.txt", "y/a.txt"]:
+        path = tmp_path / rel
+        path.parent.mkdir()
+        path.write_bytes(b"x" * 8192)
+        extras.append(path)
+
+    commands = []
+    monkeypatch.setattr(submit, "_run_returncode", lambda cmd: commands.append(cmd) or 0)
+    submit.transfer_files("hpc", "~/jobs/x", script, extras)
+
+    sources = [cmd[-2] for cmd in commands]
+    assert set(sources[:2]) == {f"{job_dir}/", str(tmp_path / "unique/u.txt")}
+    assert sources[2:] == [str(tmp_path / r) for r in ["other/data.csv", "x/a.txt", "y/a.txt"]]
+
+
+def test_resolve_remote_path_runs_probe_under_sh(tmp_path, monkeypatch):
+    remote = tmp_path / "job"
+    remote.mkdir()
+    (tmp_path / "job_1").mkdir()
+    commands = []
+    real_run = subprocess.run
+
+    def run(cmd, **kwargs):
+        commands.append(cmd)
+        # Emulate ssh: the remote command string goes to the login shell.
+        return real_run(["sh", "-c", cmd[-1]], **kwargs)
+
+    monkeypatch.setattr(submit.subprocess, "run", run)
+    monkeypatch.setattr("builtins.input", lambda prompt: "n")
+
+    assert submit.resolve_remote_path("hpc", str(remote)) == f"{remote}_2"
+    assert commands[0][-1].startswith("sh -c ")
+
+
+def test_check_job_status_runs_under_sh(tmp_path, monkeypatch, capsys):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "squeue").write_text("#!/bin/sh\necho 'RUNNING None'\n")
+    (bin_dir / "sacct").write_text("#!/bin/sh\n")
+    for tool in bin_dir.iterdir():
+        tool.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    commands = []
+    real_run = subprocess.run
+
+    def run(cmd, **kwargs):
+        commands.append(cmd)
+        return real_run(["sh", "-c", cmd[-1]], **kwargs)
+
+    monkeypatch.setattr(submit.subprocess, "run", run)
+
+    submit.check_job_status("hpc", 42)
+    assert capsys.readouterr().out == "Job 42: RUNNING None\n"
+    assert commands[0][-1].startswith("sh -c ")